@@ -4,13 +4,30 @@ Interactive ML model for multi-feedstock anaerobic co-digestion
 Based on: Pathmanaban et al. (2025) - R² = 0.9887
 """
 
+import os
+
+def _env_int(name, default):
+    """Positive int from an env variable (first entry of lists like "4,2"),
+    falling back to default when unset or unparsable"""
+    try:
+        return max(1, int(os.environ.get(name, "").split(",")[0]))
+    except ValueError:
+        return default
+
+# Cap LightGBM's OpenMP threads per inference (must be set before it is imported)
+os.environ.setdefault("OMP_NUM_THREADS", "2")
+_LGBM_THREADS = _env_int("OMP_NUM_THREADS", 2)
+
 import gradio as gr
-import pandas as pd
 import numpy as np
 import joblib
-import shap
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import shutil
+import tempfile
+from collections import OrderedDict
+from functools import cache
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,9 +39,10 @@ print("Loading model files...")
 
 try:
     model = joblib.load('lightgbm_model.pkl')
-    feature_names = joblib.load('feature_names.pkl')
+    feature_names = tuple(joblib.load('feature_names.pkl'))  # immutable, indexed per click
     feature_stats = joblib.load('feature_stats.pkl')
     performance_metrics = joblib.load('performance_metrics.pkl')
+    model.set_params(n_jobs=_LGBM_THREADS)
     print("✅ Model loaded successfully")
 except Exception as e:
     print(f"❌ Error loading model: {e}")
@@ -33,21 +51,236 @@ except Exception as e:
     feature_stats = None
     performance_metrics = None
 
-try:
-    explainer = joblib.load('shap_explainer.pkl')
-    print("✅ SHAP explainer loaded")
-except:
-    if model is not None:
+# Build the explainer from the loaded model instead of loading the 4.3 MB
+# shap_explainer.pkl pickle
+if model is not None:
+    try:
         print("Creating SHAP explainer...")
-        explainer = shap.TreeExplainer(model)
+        import shap
+        explainer = shap.TreeExplainer(model, feature_perturbation='tree_path_dependent')
         print("✅ SHAP explainer created")
-    else:
+    except Exception as e:
+        print(f"❌ Error creating SHAP explainer: {e}")
         explainer = None
+else:
+    explainer = None
+
+# Warm up prediction and SHAP paths so the first user click is not slow
+if model is not None:
+    try:
+        _warm = np.zeros((1, len(feature_names)), dtype=np.float32)
+        model.predict(_warm)
+        if explainer is not None:
+            explainer.shap_values(_warm, check_additivity=False)
+        print("✅ Model warmed up")
+    except Exception as e:
+        print(f"⚠️ Warm-up skipped: {e}")
 
 # ============================================================================
 # PREDICTION FUNCTION
 # ============================================================================
 
+# Slider argument order of predict_biogas (matches the trained feature order)
+_FEATURE_ORDER = [
+    'Pig Manure (kg)', 'Kitchen Food Waste (kg)', 'Chicken Litter (kg)',
+    'Cassava (kg)', 'Bagasse Feed (kg)', 'Energy Grass (kg)', 'Banana Shafts (kg)',
+    'Alcohol Waste (kg)', 'Municipal Residue (kg)', 'Fish Waste (kg)',
+    'Water (L)', 'Diesel (L)', 'Electricity Use (kWh)', 'C/N Ratio', 'Digester Temp (C)',
+    'Temperature (C)', 'Humidity (%)', 'Rainfall (mm)'
+]
+
+# Column permutation, only needed if the saved feature order ever differs
+if feature_names is not None and list(feature_names) != _FEATURE_ORDER:
+    _FEATURE_PERM = [_FEATURE_ORDER.index(name) for name in feature_names]
+else:
+    _FEATURE_PERM = None
+
+# Constants for the derived metrics and the static parts of the result text
+_KWH_PER_M3 = 6.5  # assuming 6.5 kWh/m³
+_DATASET_MEAN = 79.21  # m³/day
+_PCT_OF_MEAN = 100 / _DATASET_MEAN
+
+_RESULT_HEADER = "\n".join([
+    "",
+    "## 🌱 PREDICTION RESULTS",
+    "",
+    "### Main Output:"
+])
+
+_RESULT_FOOTER = "\n".join([
+    "",
+    "### Model Performance:",
+    "- Testing R²: 0.9887",
+    "- RMSE: 1.17 m³",
+    "- MAE: 0.91 m³",
+    "- MAPE: 1.15%",
+    "",
+    "---",
+    "*Model trained on 15,298 observations over 14 years*"
+])
+
+# Pre-built SHAP figure specs as plain dicts, validated once by plotly; each
+# prediction only adds its data arrays
+@cache
+def _figure_templates():
+    """Build the figure specs, importing plotly on first use"""
+    import plotly.graph_objects as go
+    
+    waterfall_fig = go.Figure(go.Waterfall(
+        name="SHAP",
+        orientation="h",
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+        increasing={"marker": {"color": "#2E7D32"}},
+        decreasing={"marker": {"color": "#C62828"}},
+        textposition="outside"
+    ))
+    waterfall_fig.update_layout(
+        title="Top 10 Feature Contributions (SHAP Values)",
+        xaxis_title="SHAP Value (Impact on Prediction)",
+        yaxis_title="Feature",
+        height=500,
+        showlegend=False,
+        template="plotly_white"
+    )
+    
+    bar_fig = go.Figure(go.Bar(
+        orientation='h',
+        textposition='outside'
+    ))
+    bar_fig.update_layout(
+        title="Feature Importance (Absolute SHAP Values)",
+        xaxis_title="Absolute Impact",
+        yaxis_title="Feature",
+        height=500,
+        showlegend=False,
+        template="plotly_white"
+    )
+    
+    waterfall_spec = waterfall_fig.to_dict()
+    bar_spec = bar_fig.to_dict()
+    return (waterfall_spec["data"][0], waterfall_spec["layout"],
+            bar_spec["data"][0], bar_spec["layout"])
+
+# LRU memo of (prediction, shap_values) keyed on the feature tuple. It is
+# shared by the single and batched click paths, so it is a plain dict behind
+# a lock rather than functools.lru_cache, which cannot be looked up or filled
+# from outside the wrapped function
+_PREDICTION_CACHE_SIZE = 512
+_prediction_cache = OrderedDict()
+_prediction_cache_lock = threading.Lock()
+
+def _cache_get(feat_tuple):
+    """Cached (prediction, shap_values) for a feature tuple, or None"""
+    with _prediction_cache_lock:
+        result = _prediction_cache.get(feat_tuple)
+        if result is not None:
+            _prediction_cache.move_to_end(feat_tuple)
+        return result
+
+def _cache_put(feat_tuple, result):
+    """Store a result, evicting the least recently used entries"""
+    with _prediction_cache_lock:
+        _prediction_cache[feat_tuple] = result
+        _prediction_cache.move_to_end(feat_tuple)
+        while len(_prediction_cache) > _PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+
+def _cached_predict_and_shap(feat_tuple):
+    """Predict and explain one scenario, memoized on the feature tuple"""
+    result = _cache_get(feat_tuple)
+    if result is not None:
+        return result
+    
+    arr = np.array([feat_tuple], dtype=np.float32)
+    if _FEATURE_PERM is not None:
+        arr = arr[:, _FEATURE_PERM]
+    prediction = float(model.predict(arr)[0])
+    
+    shap_values = None
+    if explainer is not None:
+        try:
+            shap_values = explainer.shap_values(arr, check_additivity=False)
+        except Exception as e:
+            print(f"SHAP calculation error: {e}")
+    
+    result = (prediction, shap_values)
+    _cache_put(feat_tuple, result)
+    return result
+
+def _format_prediction(prediction, shap_values):
+    """Build result text and SHAP figures for one scenario"""
+    
+    # Calculate derived metrics
+    daily_energy = prediction * _KWH_PER_M3  # kWh/day
+    annual_production = prediction * 0.365  # thousand m³/year
+    vs_average = prediction - _DATASET_MEAN  # Difference from dataset mean
+    
+    # Create result text (static sections are pre-joined)
+    result_text = "\n".join([
+        _RESULT_HEADER,
+        f"**Predicted Biogas Production: {prediction:.2f} m³/day**",
+        "",
+        "### Derived Metrics:",
+        f"- **Energy Equivalent:** {daily_energy:.1f} kWh/day",
+        f"- **Annual Production:** {annual_production:.1f} thousand m³/year",
+        f"- **vs. Facility Average:** {vs_average:+.2f} m³/day ({vs_average * _PCT_OF_MEAN:+.1f}%)",
+        _RESULT_FOOTER
+    ])
+    
+    # Calculate SHAP values for explanation
+    if shap_values is not None:
+        try:
+            # Get SHAP contributions
+            vals = shap_values[0] if shap_values.ndim == 2 else shap_values
+            
+            # Top 10 by absolute value (partial selection, then order)
+            abs_vals = np.abs(vals)
+            top_k = min(10, abs_vals.size)
+            top_idx = np.argpartition(-abs_vals, top_k - 1)[:top_k]
+            top_idx = top_idx[np.argsort(-abs_vals[top_idx])]
+            sorted_shap = [(feature_names[i], float(vals[i])) for i in top_idx]
+            
+            names = [item[0] for item in sorted_shap]
+            values = [item[1] for item in sorted_shap]
+            
+            import plotly.graph_objects as go
+            waterfall_trace, waterfall_layout, bar_trace, bar_layout = _figure_templates()
+            
+            # Create SHAP waterfall plot (static parts were validated when the
+            # specs were built, so plotly's per-property validation is skipped)
+            fig = go.Figure(
+                data=[dict(
+                    waterfall_trace,
+                    y=names,
+                    x=values,
+                    measure=["relative"] * len(values),
+                    text=[f"{v:+.2f}" for v in values]
+                )],
+                layout=waterfall_layout,
+                _validate=False
+            )
+            
+            # Create feature importance bar chart
+            fig2 = go.Figure(
+                data=[dict(
+                    bar_trace,
+                    y=names,
+                    x=[abs(v) for v in values],
+                    marker={"color": ['#2E7D32' if v > 0 else '#C62828' for v in values]},
+                    text=[f"{abs(v):.2f}" for v in values]
+                )],
+                layout=bar_layout,
+                _validate=False
+            )
+            
+            return result_text, fig, fig2
+            
+        except Exception as e:
+            print(f"SHAP calculation error: {e}")
+            return result_text, None, None
+    
+    return result_text, None, None
+
 def predict_biogas(
     # Feedstocks
     pig_manure, kitchen_waste, chicken_litter, cassava, bagasse,
@@ -63,132 +296,111 @@ def predict_biogas(
         return "❌ Model not loaded. Please check setup.", None, None
     
     try:
-        # Create input DataFrame
-        input_data = {
-            'Pig Manure (kg)': pig_manure,
-            'Kitchen Food Waste (kg)': kitchen_waste,
-            'Chicken Litter (kg)': chicken_litter,
-            'Cassava (kg)': cassava,
-            'Bagasse Feed (kg)': bagasse,
-            'Energy Grass (kg)': energy_grass,
-            'Banana Shafts (kg)': banana_shafts,
-            'Alcohol Waste (kg)': alcohol_waste,
-            'Municipal Residue (kg)': municipal_residue,
-            'Fish Waste (kg)': fish_waste,
-            'Water (L)': water,
-            'Diesel (L)': diesel,
-            'Electricity Use (kWh)': electricity,
-            'C/N Ratio': cn_ratio,
-            'Digester Temp (C)': digester_temp,
-            'Temperature (C)': ambient_temp,
-            'Humidity (%)': humidity,
-            'Rainfall (mm)': rainfall
-        }
-        
-        input_df = pd.DataFrame([input_data])
-        input_df = input_df[feature_names]  # Ensure correct order
+        # Raw feature vector in _FEATURE_ORDER (no pandas on the hot path)
+        feat_tuple = tuple(map(float, (
+            pig_manure, kitchen_waste, chicken_litter, cassava, bagasse,
+            energy_grass, banana_shafts, alcohol_waste, municipal_residue, fish_waste,
+            water, diesel, electricity, cn_ratio, digester_temp,
+            ambient_temp, humidity, rainfall
+        )))
         
-        # Make prediction
-        prediction = model.predict(input_df)[0]
+        # Make prediction (cached for repeated slider submissions)
+        prediction, shap_values = _cached_predict_and_shap(feat_tuple)
         
-        # Calculate derived metrics
-        daily_energy = prediction * 6.5  # kWh (assuming 6.5 kWh/m³)
-        annual_production = prediction * 365 / 1000  # thousand m³/year
-        vs_average = prediction - 79.21  # Difference from dataset mean
-        
-        # Create result text
-        result_text = f"""
-## 🌱 PREDICTION RESULTS
-
-### Main Output:
-**Predicted Biogas Production: {prediction:.2f} m³/day**
-
-### Derived Metrics:
-- **Energy Equivalent:** {daily_energy:.1f} kWh/day
-- **Annual Production:** {annual_production:.1f} thousand m³/year
-- **vs. Facility Average:** {vs_average:+.2f} m³/day ({vs_average/79.21*100:+.1f}%)
-
-### Model Performance:
-- Testing R²: 0.9887
-- RMSE: 1.17 m³
-- MAE: 0.91 m³
-- MAPE: 1.15%
-
----
-*Model trained on 15,298 observations over 14 years*
-        """
-        
-        # Calculate SHAP values for explanation
-        if explainer is not None:
-            try:
-                shap_values = explainer.shap_values(input_df)
-                
-                # Get SHAP contributions
-                if len(shap_values.shape) == 1:
-                    shap_dict = {name: float(val) for name, val in zip(feature_names, shap_values)}
-                else:
-                    shap_dict = {name: float(val) for name, val in zip(feature_names, shap_values[0])}
-                
-                # Sort by absolute value
-                sorted_shap = sorted(shap_dict.items(), key=lambda x: abs(x[1]), reverse=True)[:10]
-                
-                # Create SHAP waterfall plot
-                fig = go.Figure(go.Waterfall(
-                    name="SHAP",
-                    orientation="h",
-                    measure=["relative"] * len(sorted_shap),
-                    y=[item[0] for item in sorted_shap],
-                    x=[item[1] for item in sorted_shap],
-                    connector={"line": {"color": "rgb(63, 63, 63)"}},
-                    increasing={"marker": {"color": "#2E7D32"}},
-                    decreasing={"marker": {"color": "#C62828"}},
-                    text=[f"{item[1]:+.2f}" for item in sorted_shap],
-                    textposition="outside"
-                ))
-                
-                fig.update_layout(
-                    title="Top 10 Feature Contributions (SHAP Values)",
-                    xaxis_title="SHAP Value (Impact on Prediction)",
-                    yaxis_title="Feature",
-                    height=500,
-                    showlegend=False,
-                    template="plotly_white"
-                )
-                
-                # Create feature importance bar chart
-                fig2 = go.Figure(go.Bar(
-                    y=[item[0] for item in sorted_shap],
-                    x=[abs(item[1]) for item in sorted_shap],
-                    orientation='h',
-                    marker_color=['#2E7D32' if item[1] > 0 else '#C62828' for item in sorted_shap],
-                    text=[f"{abs(item[1]):.2f}" for item in sorted_shap],
-                    textposition='outside'
-                ))
-                
-                fig2.update_layout(
-                    title="Feature Importance (Absolute SHAP Values)",
-                    xaxis_title="Absolute Impact",
-                    yaxis_title="Feature",
-                    height=500,
-                    showlegend=False,
-                    template="plotly_white"
-                )
-                
-                return result_text, fig, fig2
-                
-            except Exception as e:
-                print(f"SHAP calculation error: {e}")
-                return result_text, None, None
-        
-        return result_text, None, None
+        return _format_prediction(prediction, shap_values)
         
     except Exception as e:
         return f"❌ Prediction error: {str(e)}", None, None
 
+def predict_biogas_packed(feature_vectors):
+    """Gradio batch handler: one model and SHAP call for all queued clicks,
+    each click carrying its 18 slider values packed in _FEATURE_ORDER"""
+    
+    n_requests = len(feature_vectors)
+    
+    if model is None:
+        return (["❌ Model not loaded. Please check setup."] * n_requests,
+                [None] * n_requests, [None] * n_requests)
+    
+    # The packed input is free-form JSON, so coerce each vector on its own and
+    # reject malformed ones per request without failing the rest of the batch
+    results = [None] * n_requests
+    rows = {}
+    for i, vec in enumerate(feature_vectors):
+        try:
+            if not isinstance(vec, (list, tuple)) or len(vec) != len(_FEATURE_ORDER):
+                raise ValueError(f"expected {len(_FEATURE_ORDER)} feature values")
+            row = tuple(float(v) for v in vec)
+            if not np.isfinite(np.asarray(row, dtype=np.float32)).all():
+                raise ValueError("feature values must be finite numbers")
+        except (TypeError, ValueError) as e:
+            results[i] = (f"❌ Prediction error: {str(e)}", None, None)
+            continue
+        rows[i] = row
+    valid = list(rows)
+    
+    # Serve repeated scenarios from the shared memo; only misses hit the model
+    misses = []
+    for i in valid:
+        cached = _cache_get(rows[i])
+        if cached is not None:
+            results[i] = _format_prediction(*cached)
+        else:
+            misses.append(i)
+    
+    # A lone miss goes through the single path
+    if len(misses) == 1:
+        results[misses[0]] = predict_biogas(*rows[misses[0]])
+    elif misses:
+        # Stack the missed scenarios into one (B, 18) matrix in _FEATURE_ORDER
+        X = np.array([rows[i] for i in misses], dtype=np.float32)
+        if _FEATURE_PERM is not None:
+            X = X[:, _FEATURE_PERM]
+        
+        try:
+            predictions = model.predict(X)
+        except Exception as e:
+            # A model failure affects every row of the shared call
+            for i in misses:
+                results[i] = (f"❌ Prediction error: {str(e)}", None, None)
+        else:
+            shap_values = None
+            if explainer is not None:
+                try:
+                    shap_values = explainer.shap_values(X, check_additivity=False)
+                except Exception as e:
+                    print(f"SHAP calculation error: {e}")
+            
+            for row, i in enumerate(misses):
+                result = (
+                    float(predictions[row]),
+                    None if shap_values is None else shap_values[row:row + 1]
+                )
+                _cache_put(rows[i], result)
+                results[i] = _format_prediction(*result)
+    
+    return tuple(list(outputs) for outputs in zip(*results))
+
 # ============================================================================
 # BATCH PREDICTION FUNCTION
 # ============================================================================
 
+# Batch results live in one per-request directory each under _RESULTS_DIR;
+# only the newest _RESULTS_KEEP are kept so disk use stays bounded
+_RESULTS_DIR = os.path.join(tempfile.gettempdir(), "biogas_predictions")
+_RESULTS_KEEP = 20
+
+def _new_results_dir():
+    """Create a directory for one batch request, pruning the oldest ones"""
+    os.makedirs(_RESULTS_DIR, exist_ok=True)
+    
+    entries = [entry for entry in os.scandir(_RESULTS_DIR) if entry.is_dir()]
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:max(0, len(entries) - (_RESULTS_KEEP - 1))]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    
+    return tempfile.mkdtemp(dir=_RESULTS_DIR)
+
 def batch_predict(file):
     """Process CSV file with multiple scenarios"""
     
@@ -198,48 +410,113 @@ def batch_predict(file):
     if file is None:
         return "❌ Please upload a CSV file", None
     
+    results_dir = None
     try:
-        # Read CSV
-        df = pd.read_csv(file.name)
+        read_options = pacsv.ReadOptions(use_threads=True, block_size=1 << 22)
         
         # Check if columns match
-        missing_cols = set(feature_names) - set(df.columns)
+        columns = pacsv.open_csv(file.name, read_options=read_options).schema.names
+        missing_cols = set(feature_names) - set(columns)
         if missing_cols:
             return f"❌ Missing columns: {missing_cols}", None
         
-        # Make predictions
-        predictions = []
-        for idx, row in df.iterrows():
-            input_df = pd.DataFrame([row[feature_names]])
-            pred = model.predict(input_df)[0]
-            predictions.append(pred)
+        # Stream the CSV in blocks (multithreaded Arrow reader) so memory stays
+        # bounded for large uploads. Every column is kept as its original text:
+        # the output file echoes the inputs exactly, and types inferred from the
+        # first block cannot break on later blocks
+        reader = pacsv.open_csv(
+            file.name,
+            read_options=read_options,
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in columns},
+                strings_can_be_null=True
+            )
+        )
+        
+        # Resolve feature columns to positions once, then slice by position
+        col_idx = [columns.index(c) for c in feature_names]
+        
+        # Running accumulators for the summary
+        n_rows = 0
+        pred_sum = 0.0
+        pred_sq_sum = 0.0
+        pred_min = np.inf
+        pred_max = -np.inf
+        abs_shap_sum = np.zeros(len(feature_names))
+        shap_ok = explainer is not None
+        
+        # One output directory per request so concurrent uploads never share a file
+        results_dir = _new_results_dir()
+        output_file = os.path.join(results_dir, "biogas_predictions.csv")
+        with open(output_file, 'w', newline='') as out:
+            for batch in reader:
+                df = batch.to_pandas()
+                
+                # Make predictions (single vectorized call per block); only the
+                # model matrix is cast to float32, empty cells become NaN
+                X = np.column_stack([
+                    batch.column(i).cast(pa.float32()).to_numpy(zero_copy_only=False)
+                    for i in col_idx
+                ])
+                predictions = model.predict(X)
+                
+                # Add predictions and append the block to the output CSV
+                df['Predicted_Biogas_m3'] = predictions
+                df.to_csv(out, index=False, header=(n_rows == 0))
+                
+                n_rows += len(predictions)
+                pred_sum += predictions.sum()
+                pred_sq_sum += np.square(predictions).sum()
+                pred_min = min(pred_min, predictions.min())
+                pred_max = max(pred_max, predictions.max())
+                
+                # Absolute SHAP per feature (single call per block)
+                if shap_ok:
+                    try:
+                        abs_shap_sum += np.abs(explainer.shap_values(X, check_additivity=False)).sum(axis=0)
+                    except Exception as e:
+                        print(f"Batch SHAP calculation error: {e}")
+                        shap_ok = False
+        
+        if n_rows == 0:
+            shutil.rmtree(results_dir, ignore_errors=True)
+            return "❌ No rows found in CSV file", None
         
-        # Add predictions to dataframe
-        df['Predicted_Biogas_m3'] = predictions
+        pred_mean = pred_sum / n_rows
+        pred_std = np.sqrt(max(pred_sq_sum / n_rows - pred_mean ** 2, 0.0))
+        
+        # Mean absolute SHAP per feature over all rows
+        shap_summary = ""
+        if shap_ok:
+            mean_abs_shap = abs_shap_sum / n_rows
+            top_idx = np.argsort(-mean_abs_shap)[:10]
+            shap_lines = [f"- **{feature_names[i]}:** {mean_abs_shap[i]:.2f}" for i in top_idx]
+            shap_summary = "### Top Feature Impacts (Mean |SHAP|):\n" + "\n".join(shap_lines)
         
         # Create summary statistics
         summary = f"""
 ## 📊 BATCH PREDICTION RESULTS
 
-**Total Scenarios:** {len(df)}
+**Total Scenarios:** {n_rows}
 
 ### Summary Statistics:
-- **Mean Production:** {np.mean(predictions):.2f} m³/day
-- **Std Deviation:** {np.std(predictions):.2f} m³/day
-- **Min Production:** {np.min(predictions):.2f} m³/day
-- **Max Production:** {np.max(predictions):.2f} m³/day
-- **Range:** {np.max(predictions) - np.min(predictions):.2f} m³/day
+- **Mean Production:** {pred_mean:.2f} m³/day
+- **Std Deviation:** {pred_std:.2f} m³/day
+- **Min Production:** {pred_min:.2f} m³/day
+- **Max Production:** {pred_max:.2f} m³/day
+- **Range:** {pred_max - pred_min:.2f} m³/day
+
+{shap_summary}
 
 ### Results saved to output file below.
         """
         
-        # Create output CSV
-        output_file = "biogas_predictions.csv"
-        df.to_csv(output_file, index=False)
-        
         return summary, output_file
         
     except Exception as e:
+        # Don't leave a partial results file behind
+        if results_dir is not None:
+            shutil.rmtree(results_dir, ignore_errors=True)
         return f"❌ Error processing file: {str(e)}", None
 
 # ============================================================================
@@ -300,6 +577,34 @@ else:
         'Rainfall (mm)': 45.72
     }
 
+# Slider defaults and ranges as arrays aligned with _FEATURE_ORDER
+means_arr = np.array([defaults[name] for name in _FEATURE_ORDER])
+mins_arr = np.array([mins[name] for name in _FEATURE_ORDER])
+maxs_arr = np.array([maxs[name] for name in _FEATURE_ORDER])
+
+# Slider layout: columns of (heading, labels) groups. Labels are listed in
+# _FEATURE_ORDER, so a slider's position in this sequence is its feature index
+_SLIDER_LAYOUT = [
+    [("#### 🌾 Feedstocks (kg/day)",
+      ["Pig Manure", "Kitchen Food Waste", "Chicken Litter", "Cassava", "Bagasse Feed"])],
+    [("#### 🌾 More Feedstocks (kg/day)",
+      ["Energy Grass", "Banana Shafts", "Alcohol Waste", "Municipal Residue", "Fish Waste"])],
+    [("#### ⚙️ Operational Parameters",
+      ["Water (L)", "Diesel (L)", "Electricity (kWh)", "C/N Ratio", "Digester Temp (°C)"]),
+     ("#### 🌡️ Climate Variables",
+      ["Ambient Temp (°C)", "Humidity (%)", "Rainfall (mm)"])]
+]
+
+def _feature_slider(i, label):
+    """Slider for the i-th feature in _FEATURE_ORDER"""
+    return gr.Slider(float(mins_arr[i]), float(maxs_arr[i]), value=float(means_arr[i]), label=label)
+
+@cache
+def _template_bytes():
+    """Single-row CSV template of default values, built once"""
+    cols = feature_names or list(defaults.keys())
+    return (",".join(cols) + "\n" + ",".join(str(defaults[c]) for c in cols)).encode()
+
 # Create Gradio interface with tabs
 with gr.Blocks(title="Biogas Production Predictor", theme=gr.themes.Soft()) as demo:
     
@@ -322,53 +627,14 @@ with gr.Blocks(title="Biogas Production Predictor", theme=gr.themes.Soft()) as d
             
             gr.Markdown("### Input Feedstock and Operational Parameters")
             
+            feature_sliders = []
             with gr.Row():
-                with gr.Column():
-                    gr.Markdown("#### 🌾 Feedstocks (kg/day)")
-                    pig_manure = gr.Slider(mins['Pig Manure (kg)'], maxs['Pig Manure (kg)'], 
-                                          value=defaults['Pig Manure (kg)'], label="Pig Manure")
-                    kitchen_waste = gr.Slider(mins['Kitchen Food Waste (kg)'], maxs['Kitchen Food Waste (kg)'], 
-                                             value=defaults['Kitchen Food Waste (kg)'], label="Kitchen Food Waste")
-                    chicken_litter = gr.Slider(mins['Chicken Litter (kg)'], maxs['Chicken Litter (kg)'], 
-                                              value=defaults['Chicken Litter (kg)'], label="Chicken Litter")
-                    cassava = gr.Slider(mins['Cassava (kg)'], maxs['Cassava (kg)'], 
-                                       value=defaults['Cassava (kg)'], label="Cassava")
-                    bagasse = gr.Slider(mins['Bagasse Feed (kg)'], maxs['Bagasse Feed (kg)'], 
-                                       value=defaults['Bagasse Feed (kg)'], label="Bagasse Feed")
-                
-                with gr.Column():
-                    gr.Markdown("#### 🌾 More Feedstocks (kg/day)")
-                    energy_grass = gr.Slider(mins['Energy Grass (kg)'], maxs['Energy Grass (kg)'], 
-                                            value=defaults['Energy Grass (kg)'], label="Energy Grass")
-                    banana_shafts = gr.Slider(mins['Banana Shafts (kg)'], maxs['Banana Shafts (kg)'], 
-                                             value=defaults['Banana Shafts (kg)'], label="Banana Shafts")
-                    alcohol_waste = gr.Slider(mins['Alcohol Waste (kg)'], maxs['Alcohol Waste (kg)'], 
-                                             value=defaults['Alcohol Waste (kg)'], label="Alcohol Waste")
-                    municipal_residue = gr.Slider(mins['Municipal Residue (kg)'], maxs['Municipal Residue (kg)'], 
-                                                 value=defaults['Municipal Residue (kg)'], label="Municipal Residue")
-                    fish_waste = gr.Slider(mins['Fish Waste (kg)'], maxs['Fish Waste (kg)'], 
-                                          value=defaults['Fish Waste (kg)'], label="Fish Waste")
-                
-                with gr.Column():
-                    gr.Markdown("#### ⚙️ Operational Parameters")
-                    water = gr.Slider(mins['Water (L)'], maxs['Water (L)'], 
-                                     value=defaults['Water (L)'], label="Water (L)")
-                    diesel = gr.Slider(mins['Diesel (L)'], maxs['Diesel (L)'], 
-                                      value=defaults['Diesel (L)'], label="Diesel (L)")
-                    electricity = gr.Slider(mins['Electricity Use (kWh)'], maxs['Electricity Use (kWh)'], 
-                                           value=defaults['Electricity Use (kWh)'], label="Electricity (kWh)")
-                    cn_ratio = gr.Slider(mins['C/N Ratio'], maxs['C/N Ratio'], 
-                                        value=defaults['C/N Ratio'], label="C/N Ratio")
-                    digester_temp = gr.Slider(mins['Digester Temp (C)'], maxs['Digester Temp (C)'], 
-                                             value=defaults['Digester Temp (C)'], label="Digester Temp (°C)")
-                    
-                    gr.Markdown("#### 🌡️ Climate Variables")
-                    ambient_temp = gr.Slider(mins['Temperature (C)'], maxs['Temperature (C)'], 
-                                            value=defaults['Temperature (C)'], label="Ambient Temp (°C)")
-                    humidity = gr.Slider(mins['Humidity (%)'], maxs['Humidity (%)'], 
-                                        value=defaults['Humidity (%)'], label="Humidity (%)")
-                    rainfall = gr.Slider(mins['Rainfall (mm)'], maxs['Rainfall (mm)'], 
-                                        value=defaults['Rainfall (mm)'], label="Rainfall (mm)")
+                for column_groups in _SLIDER_LAYOUT:
+                    with gr.Column():
+                        for heading, labels in column_groups:
+                            gr.Markdown(heading)
+                            for label in labels:
+                                feature_sliders.append(_feature_slider(len(feature_sliders), label))
             
             predict_btn = gr.Button("🚀 Predict Biogas Production", variant="primary", size="lg")
             
@@ -379,15 +645,23 @@ with gr.Blocks(title="Biogas Production Predictor", theme=gr.themes.Soft()) as d
                 shap_plot = gr.Plot(label="SHAP Feature Contributions")
                 importance_plot = gr.Plot(label="Feature Importance")
             
+            # Slider values packed client-side into one hidden input, so each
+            # click sends and preprocesses a single component instead of 18
+            feature_vector = gr.JSON(value=means_arr.tolist(), visible=False)
+            for i, slider in enumerate(feature_sliders):
+                slider.input(
+                    fn=None,
+                    inputs=[slider, feature_vector],
+                    outputs=[feature_vector],
+                    js=f"(v, vec) => {{ const out = [...vec]; out[{i}] = v; return [out]; }}"
+                )
+            
             predict_btn.click(
-                fn=predict_biogas,
-                inputs=[
-                    pig_manure, kitchen_waste, chicken_litter, cassava, bagasse,
-                    energy_grass, banana_shafts, alcohol_waste, municipal_residue, fish_waste,
-                    water, diesel, electricity, cn_ratio, digester_temp,
-                    ambient_temp, humidity, rainfall
-                ],
-                outputs=[output_text, shap_plot, importance_plot]
+                fn=predict_biogas_packed,
+                inputs=[feature_vector],
+                outputs=[output_text, shap_plot, importance_plot],
+                batch=True,
+                max_batch_size=32
             )
         
         # ===== TAB 2: BATCH PREDICTION =====
@@ -401,13 +675,8 @@ with gr.Blocks(title="Biogas Production Predictor", theme=gr.themes.Soft()) as d
             Download the template below to see the required format.
             """)
             
-            # Create template CSV
-            template_data = {feature: [defaults[feature]] for feature in feature_names}
-            template_df = pd.DataFrame(template_data)
-            template_csv = template_df.to_csv(index=False)
-            
             gr.Markdown("#### Step 1: Download Template")
-            gr.File(value=template_csv.encode(), label="CSV Template", file_count="single")
+            gr.File(value=_template_bytes(), label="CSV Template", file_count="single")
             
             gr.Markdown("#### Step 2: Upload Your Data")
             file_input = gr.File(label="Upload CSV", file_count="single", type="filepath")
@@ -520,4 +789,15 @@ with gr.Blocks(title="Biogas Production Predictor", theme=gr.themes.Soft()) as d
 
 # Launch the app
 if __name__ == "__main__":
-    demo.launch()
+    # Queue requests so concurrent users don't oversubscribe LightGBM threads;
+    # count the CPUs this process may run on, not the host's cores
+    if hasattr(os, "sched_getaffinity"):
+        n_cpus = len(os.sched_getaffinity(0))
+    else:
+        n_cpus = os.cpu_count() or 1
+    concurrency_limit = _env_int("CONCURRENCY_LIMIT", max(1, n_cpus // _LGBM_THREADS))
+    
+    demo.queue(
+        default_concurrency_limit=concurrency_limit,
+        max_size=32
+    ).launch()